@@ -9,7 +9,7 @@ version = {}
 with open("vFXT/version.py") as f:
     exec(f.read(), version) #pylint: disable=exec-used
 
-base_deps = ['future', 'requests']
+base_deps = ['future', 'requests', 'futures; python_version < "3"']
 aws_deps = ['boto']
 gce_deps = ['oauth2client', 'google-api-python-client']
 azure_deps = ['requests-oauthlib', 'adal==1.2.4', 'azure-cli-core==2.10.1', 'azure-common==1.1.25', 'azure-mgmt-authorization==0.60.0', 'azure-mgmt-compute==13.0.0', 'azure-identity==1.3.1', 'azure-mgmt-msi==1.0.0', 'azure-mgmt-network==11.0.0', 'azure-mgmt-resource==10.1.0', 'azure-mgmt-storage==11.1.0', 'azure-storage-blob==12.4.0', 'azure-storage-queue==12.1.2', 'azure-storage-common==2.1.0', 'knack==0.7.2', 'msrest==0.6.18', 'msrestazure==0.6.4']
@@ -0,0 +1,578 @@
+#!/usr/bin/python
+# Copyright (c) 2015-2020 Avere Systems, Inc.  All Rights Reserved.
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See LICENSE in the project root for license information.
+'''Cluster xmlrpc handling against a fake cluster xmlrpc server
+
+These run offline and need no test_config.json.
+'''
+import logging
+import math
+import threading
+import time
+import unittest
+
+import vFXT.cluster
+import vFXT.xmlrpcClt
+from vFXT.cidr import Cidr
+from vFXT.cluster import Cluster, xmlrpclib_Fault
+from vFXT.service import vFXTConfigurationException, vFXTServiceFailure, vFXTStatusFailure
+
+logging.basicConfig()
+
+class FakeService(object):
+    POLLTIME = 0
+    XMLRPC_RETRIES = 2
+    CLOUD_API_RETRIES = 1
+
+class FakeMethod(object):
+    def __init__(self, server, name):
+        self.server = server
+        self.name = name
+    def __getattr__(self, name):
+        return FakeMethod(self.server, '{}.{}'.format(self.name, name))
+    def __call__(self, *args):
+        return self.server.dispatch(self.name, args)
+
+class FakeTransport(object):
+    def __init__(self):
+        self.timeout = None
+        self.timeouts = [] # timeout in effect for each request
+
+class FakeXmlrpc(object):
+    '''Minimal xmlrpc client stand in
+
+        handlers maps method names to a return value or a callable taking the
+        call arguments.  Every call is recorded in calls as (name, args).
+        system.multicall is dispatched per call unless multicall is
+        overridden with a callable taking the marshalled call list.
+    '''
+    def __init__(self, handlers=None, multicall=None):
+        self.handlers = handlers or {}
+        self.multicall = multicall
+        self.calls = []
+        self.transport = FakeTransport()
+    def __call__(self, attr):
+        return getattr(self, attr) # ServerProxy('transport')
+    def __getattr__(self, name):
+        if name.startswith('__'):
+            raise AttributeError(name)
+        return FakeMethod(self, name)
+    def dispatch(self, name, args):
+        self.calls.append((name, args))
+        self.transport.timeouts.append(self.transport.timeout)
+        if name == 'system.multicall':
+            if self.multicall:
+                return self.multicall(args[0])
+            results = []
+            for call in args[0]:
+                try:
+                    results.append([self.dispatch(call['methodName'], tuple(call['params']))])
+                except xmlrpclib_Fault as e:
+                    results.append({'faultCode': e.faultCode, 'faultString': e.faultString})
+            return results
+        handler = self.handlers.get(name, 'success')
+        return handler(*args) if callable(handler) else handler
+    def called(self, name):
+        return [args for n, args in self.calls if n == name]
+
+class FakeNode(object):
+    def __init__(self, ip, name):
+        self._ip = ip
+        self._name = name
+    def ip(self):
+        return self._ip
+    def name(self):
+        return self._name
+    def in_use_addresses(self):
+        return [self._ip]
+
+class Cluster_xmlrpc_test(unittest.TestCase):
+    def setUp(self):
+        self.cluster = Cluster(FakeService())
+        self.cluster._sleep = lambda duration=None: None
+
+    def test_multicall(self):
+        c = self.cluster
+        xmlrpc = FakeXmlrpc({'cluster.get': {'name': 'c'}, 'vserver.list': ['vs']})
+        self.assertEqual(c._xmlrpc_multicall(xmlrpc, []), [])
+        self.assertEqual(xmlrpc.calls, [])
+        r = c._xmlrpc_multicall(xmlrpc, [('cluster.get', ()), ('vserver.list', ())])
+        self.assertEqual(r, [{'name': 'c'}, ['vs']])
+        self.assertEqual(len(xmlrpc.called('system.multicall')), 1)
+        self.assertTrue(c.use_multicall)
+
+    def test_multicall_fault_rerun(self):
+        c = self.cluster
+        attempts = []
+        def busy(arg):
+            attempts.append(arg)
+            if len(attempts) == 1:
+                raise xmlrpclib_Fault(109, 'busy')
+            return arg
+        xmlrpc = FakeXmlrpc({'node.get': busy, 'cluster.get': 'ok'})
+        r = c._xmlrpc_multicall(xmlrpc, [('cluster.get', ()), ('node.get', ('n',))])
+        self.assertEqual(r, ['ok', 'n'])
+        # only the faulted call is rerun outside the batch
+        self.assertEqual(xmlrpc.calls[-1], ('node.get', ('n',)))
+        self.assertEqual(len(xmlrpc.called('cluster.get')), 1)
+
+    def test_multicall_unsupported(self):
+        c = self.cluster
+        def unsupported(calls):
+            raise xmlrpclib_Fault(1, 'no such method system.multicall')
+        xmlrpc = FakeXmlrpc({'cluster.get': 'ok'}, multicall=unsupported)
+        r = c._xmlrpc_multicall(xmlrpc, [('cluster.get', ()), ('vserver.get', ('vs',))])
+        self.assertEqual(r, ['ok', 'success'])
+        self.assertFalse(c.use_multicall)
+        self.assertEqual(xmlrpc.called('vserver.get'), [('vs',)])
+        # not attempted again once disabled
+        c._xmlrpc_multicall(xmlrpc, [('cluster.get', ())])
+        self.assertEqual(len(xmlrpc.called('system.multicall')), 1)
+
+    def test_multicall_request_failure(self):
+        c = self.cluster
+        def timeout(calls):
+            raise IOError('read timeout')
+        xmlrpc = FakeXmlrpc({'cluster.get': 'ok'}, multicall=timeout)
+        # idempotent calls are rerun individually
+        self.assertEqual(c._xmlrpc_multicall(xmlrpc, [('cluster.get', ())]), ['ok'])
+        self.assertTrue(c.use_multicall)
+
+        # mutations are not
+        self.assertRaises(IOError, c._xmlrpc_multicall, xmlrpc, [('vserver.addClientIPs', ('vs', {}))], idempotent=False)
+        self.assertEqual(xmlrpc.called('vserver.addClientIPs'), [])
+
+    def test_join_wait(self):
+        self.assertEqual(Cluster._join_wait(0), 500)
+        self.assertEqual(Cluster._join_wait(1), 500)
+        self.assertEqual(Cluster._join_wait(2), 847)
+        self.assertEqual(Cluster._join_wait(3), 1194)
+        self.assertEqual(Cluster._join_wait(4), 1194)
+        self.assertEqual(Cluster._join_wait(5), 1541)
+        for count in range(1, 129):
+            wait = Cluster._join_wait(count)
+            self.assertIsInstance(wait, int)
+            self.assertGreaterEqual(wait, 500 + 500 * math.log(count))
+            self.assertGreaterEqual(wait, Cluster._join_wait(count - 1))
+
+    def test_cancel(self):
+        c = Cluster(FakeService())
+        raised = []
+        def sleeper():
+            try:
+                c._sleep(30)
+            except vFXTStatusFailure as e:
+                raised.append(e)
+        t = threading.Thread(target=sleeper)
+        t.start()
+        start = time.time()
+        c.cancel()
+        t.join(5)
+        self.assertFalse(t.is_alive())
+        self.assertLess(time.time() - start, 5)
+        self.assertEqual(len(raised), 1)
+        # later waits abort too
+        self.assertRaises(vFXTStatusFailure, c._sleep)
+
+        c = Cluster(FakeService())
+        xmlrpc = FakeXmlrpc({'cluster.getActivity': {'state': 'running', 'status': 'working'}})
+        c.xmlrpc = lambda: xmlrpc
+        c._log_conditions = lambda xmlrpc=None: None
+        threading.Timer(0.1, c.cancel).start()
+        self.assertRaises(vFXTStatusFailure, c._xmlrpc_wait_for_activity, 'act', 'failed')
+
+    def _activity_server(self, states):
+        '''states maps activity ids to the states returned by successive polls'''
+        polls = {}
+        def get_activity(activity):
+            polls[activity] = polls.get(activity, 0) + 1
+            seq = states[activity]
+            state = seq[min(polls[activity], len(seq)) - 1]
+            return {'state': state, 'status': '{} {}'.format(activity, state)}
+        return FakeXmlrpc({'cluster.getActivity': get_activity}), polls
+
+    def test_wait_for_activities(self):
+        c = self.cluster
+        c._log_conditions = lambda xmlrpc=None: None
+        c._backoff_sleep = lambda attempt, max_backoff=None: 1
+        xmlrpc, polls = self._activity_server({'a': ['running', 'success'], 'b': ['running', 'running', 'running', 'success']})
+        c.xmlrpc = lambda: xmlrpc
+        c._xmlrpc_wait_for_activities({'a': 'a failed', 'b': 'b failed', 'success': 'ignored'})
+        self.assertEqual(polls, {'a': 2, 'b': 4})
+        # both are polled in one batch, then b alone once a completes
+        self.assertEqual(len(xmlrpc.called('system.multicall')), 2)
+        self.assertEqual(xmlrpc.called('cluster.getActivity')[-2:], [('b',), ('b',)])
+
+        # nothing to wait on
+        xmlrpc.calls = []
+        c._xmlrpc_wait_for_activities({'success': 'ignored'})
+        self.assertEqual(xmlrpc.calls, [])
+
+    def test_wait_for_activities_failure(self):
+        c = self.cluster
+        c._log_conditions = lambda xmlrpc=None: None
+        c._backoff_sleep = lambda attempt, max_backoff=None: 1
+        xmlrpc, polls = self._activity_server({'a': ['running'], 'b': ['running', 'failure']})
+        c.xmlrpc = lambda: xmlrpc
+        with self.assertRaises(vFXTConfigurationException) as cm:
+            c._xmlrpc_wait_for_activities({'a': 'a failed', 'b': 'b failed'})
+        self.assertIn('b failed', str(cm.exception))
+
+    def test_wait_for_activities_timeout(self):
+        class SlowService(FakeService):
+            POLLTIME = 1
+        c = Cluster(SlowService())
+        c._log_conditions = lambda xmlrpc=None: None
+        slept = []
+        def backoff_sleep(attempt, max_backoff=None):
+            slept.append(attempt)
+            return 2
+        c._backoff_sleep = backoff_sleep
+        xmlrpc, polls = self._activity_server({'a': ['running'], 'b': ['running']})
+        c.xmlrpc = lambda: xmlrpc
+        # 5 retries is 5 seconds of polling, the polls sleep 2 seconds apart
+        with self.assertRaises(vFXTConfigurationException) as cm:
+            c._xmlrpc_wait_for_activities({'a': 'a failed', 'b': 'b failed'}, retries=5)
+        self.assertIn('Timed out', str(cm.exception))
+        self.assertEqual(slept, [0, 1, 2])
+        self.assertEqual(polls, {'a': 4, 'b': 4})
+
+    def test_parallel_call(self):
+        called = []
+        loads = []
+        barrier = threading.Barrier(3, timeout=5)
+        class FakeInstance(object):
+            def __init__(self, service, instance_id):
+                loads.append(instance_id)
+                if instance_id == 'flaky' and loads.count('flaky') == 1:
+                    raise Exception('initial load failed')
+                self.instance_id = instance_id
+            def destroy(self, **options):
+                barrier.wait() # all three run at once
+                called.append((self.instance_id, options))
+                if self.instance_id == 'bad':
+                    raise Exception('destroy failed')
+        self.addCleanup(setattr, vFXT.cluster, 'ServiceInstance', vFXT.cluster.ServiceInstance)
+        vFXT.cluster.ServiceInstance = FakeInstance
+
+        c = self.cluster
+        c.parallel_call([], 'destroy')
+        class Instance(object):
+            def __init__(self, instance_id):
+                self.service = c.service
+                self.instance_id = instance_id
+        instances = [Instance(_) for _ in ['good', 'bad', 'flaky']]
+        with self.assertRaises(vFXTServiceFailure) as cm:
+            c.parallel_call(instances, 'destroy', quick_destroy=True)
+        failed = cm.exception.args[0]
+        self.assertEqual(len(failed), 1)
+        self.assertIn('bad', failed[0][0])
+        self.assertEqual(str(failed[0][1]), 'destroy failed')
+        self.assertEqual(sorted(called), [(_, {'quick_destroy': True}) for _ in ['bad', 'flaky', 'good']])
+        self.assertEqual(loads.count('flaky'), 2)
+
+        called[:] = []
+        barrier.reset()
+        c.parallel_call(instances[::2] + [Instance('other')], 'destroy')
+        self.assertEqual(len(called), 3)
+
+        # at most PARALLEL_CALL_WORKERS calls run at once
+        active = {'now': 0, 'max': 0}
+        lock = threading.Lock()
+        class SlowInstance(FakeInstance):
+            def destroy(self, **options):
+                with lock:
+                    active['now'] += 1
+                    active['max'] = max(active['max'], active['now'])
+                time.sleep(0.05)
+                with lock:
+                    active['now'] -= 1
+        vFXT.cluster.ServiceInstance = SlowInstance
+        c.PARALLEL_CALL_WORKERS = 2
+        c.parallel_call([Instance(_) for _ in range(6)], 'destroy')
+        self.assertEqual(active['max'], 2)
+
+    def test_node_map(self):
+        class StatusNode(object):
+            def __init__(self, idx, on, barrier=None):
+                self.idx = idx
+                self.on = on
+                self.barrier = barrier
+            def id(self):
+                return 'node{}'.format(self.idx)
+            def status(self):
+                if self.barrier:
+                    self.barrier.wait() # all run at once
+                time.sleep(0.01 * (4 - self.idx)) # later nodes finish first
+                return 'status{}'.format(self.idx)
+            def is_on(self):
+                return self.on
+            def is_off(self):
+                return not self.on
+
+        c = self.cluster
+        barrier = threading.Barrier(4, timeout=5)
+        c.nodes = [StatusNode(_, True, barrier) for _ in range(4)]
+        self.assertEqual(c.status(), [{'node{}'.format(_): 'status{}'.format(_)} for _ in range(4)])
+        barrier.reset()
+        self.assertEqual(c._node_map('status'), ['status{}'.format(_) for _ in range(4)])
+        self.assertTrue(c.is_on())
+        self.assertFalse(c.is_off())
+        c.nodes[2].on = False
+        self.assertFalse(c.is_on())
+        self.assertFalse(c.is_off())
+
+        c.nodes = [StatusNode(0, False)]
+        self.assertEqual(c._node_map('status'), ['status0'])
+        self.assertTrue(c.is_off())
+        c.nodes = []
+        self.assertEqual(c._node_map('status'), [])
+
+    def _address_server(self, cluster_ips, vservers, mgmt='10.0.0.1'):
+        return FakeXmlrpc({
+            'cluster.get': {'mgmtIP': {'IP': mgmt}, 'clusterIPs': [{'firstIP': f, 'lastIP': l} for f, l in cluster_ips]},
+            'vserver.list': list(vservers),
+            'vserver.get': lambda vs: {vs: {'clientFacingIPs': [{'firstIP': f, 'lastIP': l} for f, l in vservers[vs]]}},
+        })
+
+    def test_in_use_addresses(self):
+        c = self.cluster
+        xmlrpc = self._address_server([('10.0.0.5', '10.0.0.6')], {'vs1': [('10.0.0.8', '10.0.0.9')], 'vs2': [('10.0.1.1', '10.0.1.1')]})
+        r = c.in_use_addresses(xmlrpc=xmlrpc)
+        self.assertIsInstance(r, frozenset)
+        self.assertEqual(sorted(r), ['10.0.0.1', '10.0.0.5', '10.0.0.6', '10.0.0.8', '10.0.0.9', '10.0.1.1'])
+        # mgmt and cluster share one cluster.get, the vservers one multicall
+        self.assertEqual(len(xmlrpc.called('cluster.get')), 1)
+        self.assertEqual(len(xmlrpc.called('system.multicall')), 1)
+
+        self.assertEqual(c.in_use_addresses('mgmt', xmlrpc=xmlrpc), frozenset(['10.0.0.1']))
+        self.assertEqual(sorted(c.in_use_addresses('cluster', xmlrpc=xmlrpc)), ['10.0.0.5', '10.0.0.6'])
+        self.assertEqual(sorted(c.in_use_addresses('vserver', xmlrpc=xmlrpc)), ['10.0.0.8', '10.0.0.9', '10.0.1.1'])
+
+    def test_in_use_addresses_merged(self):
+        c = self.cluster
+        # overlapping, adjacent, contained, and duplicate ranges
+        cluster_ips = [('10.0.0.3', '10.0.0.7'), ('10.0.0.8', '10.0.0.8'), ('10.0.0.4', '10.0.0.5')]
+        vservers = {'vs': [('10.0.0.6', '10.0.1.1'), ('10.0.0.20', '10.0.0.20')], 'vs2': [('10.0.0.3', '10.0.0.7')]}
+        xmlrpc = self._address_server(cluster_ips, vservers, mgmt='10.0.0.5')
+        expected = sorted(Cidr.expand_address_range('10.0.0.3', '10.0.1.1'), key=Cidr.from_address)
+        self.assertEqual(sorted(c.in_use_addresses(xmlrpc=xmlrpc), key=Cidr.from_address), expected)
+
+        # disjoint ranges stay apart
+        xmlrpc = self._address_server([('10.0.0.3', '10.0.0.4'), ('10.0.0.10', '10.0.0.10')], {}, mgmt='10.0.0.6')
+        self.assertEqual(sorted(c.in_use_addresses(xmlrpc=xmlrpc), key=Cidr.from_address), ['10.0.0.3', '10.0.0.4', '10.0.0.6', '10.0.0.10'])
+
+    def _naming_server(self, nodes):
+        '''nodes maps node name to (id, primary cluster address)'''
+        state = {name: {'name': name, 'id': node_id, 'primaryClusterIP': {'IP': ip}} for name, (node_id, ip) in nodes.items()}
+        def rename(old, new):
+            if new in state:
+                raise xmlrpclib_Fault(100, "node name {} is in use".format(new))
+            state[new] = state.pop(old)
+            state[new]['name'] = new
+            return 'success'
+        xmlrpc = FakeXmlrpc({
+            'node.list': lambda: list(state),
+            'node.get': lambda name: {name: dict(state[name])},
+            'node.rename': rename,
+        })
+        return xmlrpc, state
+
+    @staticmethod
+    def _names(state):
+        return {node['primaryClusterIP']['IP']: name for name, node in state.items()}
+
+    def test_set_node_naming_policy(self):
+        c = self.cluster
+        xmlrpc, state = self._naming_server({'node-1': ('id1', '10.0.0.1'), 'node-2': ('id2', '10.0.0.2'), 'node-3': ('id3', '10.0.0.3')})
+        c.nodes = [FakeNode('10.0.0.1', 'inst-1'), FakeNode('10.0.0.2', 'inst-2'), FakeNode('10.0.0.3', 'node-3')]
+        c.set_node_naming_policy(xmlrpc=xmlrpc)
+        self.assertEqual(self._names(state), {'10.0.0.1': 'inst-1', '10.0.0.2': 'inst-2', '10.0.0.3': 'node-3'})
+        self.assertEqual(sorted(xmlrpc.called('node.rename')), [('node-1', 'inst-1'), ('node-2', 'inst-2')])
+        # node details are fetched in one batch
+        self.assertEqual(len(xmlrpc.called('system.multicall')), 1)
+
+        # already named, nothing to do
+        xmlrpc.calls = []
+        c.set_node_naming_policy(xmlrpc=xmlrpc)
+        self.assertEqual(xmlrpc.called('node.rename'), [])
+
+    def test_set_node_naming_policy_swap(self):
+        c = self.cluster
+        xmlrpc, state = self._naming_server({'a': ('id1', '10.0.0.1'), 'b': ('id2', '10.0.0.2'), 'c': ('id3', '10.0.0.3')})
+        c.nodes = [FakeNode('10.0.0.1', 'b'), FakeNode('10.0.0.2', 'a'), FakeNode('10.0.0.3', 'inst-3')]
+        c.set_node_naming_policy(xmlrpc=xmlrpc)
+        self.assertEqual(self._names(state), {'10.0.0.1': 'b', '10.0.0.2': 'a', '10.0.0.3': 'inst-3'})
+        # the swapped nodes go through their ids, the free name is renamed directly
+        renames = xmlrpc.called('node.rename')
+        self.assertEqual(len(renames), 5)
+        self.assertIn(('c', 'inst-3'), renames)
+
+    def test_set_node_naming_policy_skipped(self):
+        c = self.cluster
+        xmlrpc, state = self._naming_server({'node-1': ('id1', '10.0.0.1')})
+        c.nodes = [FakeNode('10.0.0.1', 'inst-1')]
+        c.node_rename = False
+        c.set_node_naming_policy(xmlrpc=xmlrpc)
+        self.assertEqual(xmlrpc.calls, [])
+
+        # failures are logged rather than raised
+        c.node_rename = True
+        def broken():
+            raise xmlrpclib_Fault(1, 'broken')
+        xmlrpc.handlers['node.list'] = broken
+        c.set_node_naming_policy(xmlrpc=xmlrpc)
+        self.assertEqual(self._names(state), {'10.0.0.1': 'node-1'})
+
+    def _join_cluster(self, nodes):
+        class JoinService(FakeService):
+            POLLTIME = 0.01
+        c = Cluster(JoinService())
+        c.nodes = [FakeNode('10.0.0.{}'.format(_), 'node{}'.format(_)) for _ in range(nodes)]
+        c._log_conditions = lambda xmlrpc=None: None
+        c._backoff_sleep = lambda attempt, max_backoff=None: c._sleep(0.02) or 0.02
+        joined = {'count': 1}
+        xmlrpc = FakeXmlrpc({'node.list': lambda: ['n'] * joined['count'], 'node.listUnconfiguredNodes': []})
+        c.xmlrpc = lambda: xmlrpc
+
+        active = {'now': 0, 'max': 0}
+        wait = c._wait_for_nodes_to_join
+        def counted(*args, **kwargs):
+            with c._join_wait_lock:
+                active['now'] += 1
+                active['max'] = max(active['max'], active['now'])
+            try:
+                return wait(*args, **kwargs)
+            finally:
+                with c._join_wait_lock:
+                    active['now'] -= 1
+        c._wait_for_nodes_to_join = counted
+        return c, joined, active
+
+    def test_wait_for_nodes_to_join(self):
+        c, joined, active = self._join_cluster(2)
+        errors = []
+        def waiter():
+            try:
+                c.wait_for_nodes_to_join(retries=1000)
+            except Exception as e:
+                errors.append(e)
+        threading.Timer(0.2, joined.update, kwargs={'count': 2}).start()
+        threads = [threading.Thread(target=waiter) for _ in range(4)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join(10)
+        self.assertEqual(errors, [])
+        # only one caller polls at a time, the rest wait and then recheck
+        self.assertEqual(active['max'], 1)
+        self.assertIsNone(c._join_wait_done)
+
+    def test_wait_for_nodes_to_join_cancel(self):
+        c, joined, active = self._join_cluster(2)
+        errors = []
+        def waiter():
+            try:
+                c.wait_for_nodes_to_join(retries=1000)
+            except Exception as e:
+                errors.append(e)
+        threads = [threading.Thread(target=waiter) for _ in range(2)]
+        for t in threads:
+            t.start()
+        time.sleep(0.1)
+        c.cancel()
+        for t in threads:
+            t.join(5)
+        self.assertFalse(any(t.is_alive() for t in threads))
+        self.assertEqual(len(errors), 2)
+        self.assertTrue(all(isinstance(_, vFXTStatusFailure) for _ in errors))
+        self.assertIsNone(c._join_wait_done)
+
+    def test_multicall_not_idempotent(self):
+        c = self.cluster
+        def partial(calls):
+            return [['act-1'], {'faultCode': 109, 'faultString': 'busy'}]
+        xmlrpc = FakeXmlrpc(multicall=partial)
+        calls = [('cluster.addClusterIPs', ({},)), ('vserver.addClientIPs', ('vs', {}))]
+        with self.assertRaises(xmlrpclib_Fault) as cm:
+            c._xmlrpc_multicall(xmlrpc, calls, idempotent=False)
+        self.assertEqual(cm.exception.faultCode, 109)
+        self.assertEqual(xmlrpc.called('cluster.addClusterIPs'), [])
+        self.assertEqual(xmlrpc.called('vserver.addClientIPs'), [])
+
+        # without system.multicall each call is made exactly once
+        def unsupported(calls):
+            raise xmlrpclib_Fault(1, 'no such method system.multicall')
+        def fail(*args):
+            raise xmlrpclib_Fault(109, 'busy')
+        xmlrpc = FakeXmlrpc({'cluster.addClusterIPs': 'act-1', 'vserver.addClientIPs': fail}, multicall=unsupported)
+        self.assertRaises(xmlrpclib_Fault, c._xmlrpc_multicall, xmlrpc, calls, idempotent=False)
+        self.assertEqual(len(xmlrpc.called('cluster.addClusterIPs')), 1)
+        self.assertEqual(len(xmlrpc.called('vserver.addClientIPs')), 1)
+
+    def test_backoff_sleep(self):
+        c = self.cluster
+        slept = []
+        c._sleep = slept.append
+        self.assertLessEqual(c._backoff_sleep(0, 60), 2)
+        self.assertEqual(c._backoff_sleep(6, 60), 60)
+        # indefinite polls keep counting attempts past the float range of 2**attempt
+        self.assertEqual(c._backoff_sleep(1100, 60), 60)
+        self.assertEqual(c._backoff_sleep(5000, 1), 1)
+        self.assertEqual(slept[1:], [60, 60, 1])
+
+    def test_xmlrpc_timeout(self):
+        c = self.cluster
+        xmlrpc = FakeXmlrpc()
+        self.addCleanup(setattr, vFXT.xmlrpcClt, 'getXmlrpcClient', vFXT.xmlrpcClt.getXmlrpcClient)
+        vFXT.xmlrpcClt.getXmlrpcClient = lambda *args, **kwargs: xmlrpc
+        c._xmlrpc_connect('10.0.0.1', ('user', 'password'))
+        self.assertEqual(xmlrpc.calls, [('system.login', ('user', 'password'))])
+        # login is bounded, later requests are not unless they are polls
+        self.assertEqual(xmlrpc.transport.timeouts, [c.XMLRPC_TIMEOUT])
+        self.assertIsNone(xmlrpc.transport.timeout)
+        c._xmlrpc_do(xmlrpc.cluster.modify, {})
+        self.assertIsNone(xmlrpc.transport.timeouts[-1])
+
+        c._log_conditions = lambda xmlrpc=None: None
+        c._backoff_sleep = lambda attempt, max_backoff=None: 1
+        poller, _ = self._activity_server({'a': ['running', 'success'], 'b': ['running', 'success']})
+        poller.transport = xmlrpc.transport
+        c.xmlrpc = lambda: poller
+        xmlrpc.transport.timeouts = []
+        c._xmlrpc_wait_for_activities({'a': 'a failed', 'b': 'b failed'})
+        self.assertEqual(set(xmlrpc.transport.timeouts), set([c.XMLRPC_TIMEOUT]))
+        self.assertIsNone(xmlrpc.transport.timeout)
+
+    def test_multicall_fault(self):
+        c = self.cluster
+        invalidated = []
+        c._xmlrpc_invalidate = lambda: invalidated.append(True)
+        faults = [xmlrpclib_Fault(101, 'session expired')]
+        def expired(calls):
+            if faults:
+                raise faults.pop()
+            return [['ok']] * len(calls)
+        xmlrpc = FakeXmlrpc({'cluster.get': 'direct'}, multicall=expired)
+        # other faults fall back for this call only
+        self.assertEqual(c._xmlrpc_multicall(xmlrpc, [('cluster.get', ())]), ['direct'])
+        self.assertTrue(c.use_multicall)
+        self.assertEqual(invalidated, [True])
+        self.assertEqual(c._xmlrpc_multicall(xmlrpc, [('cluster.get', ())]), ['ok'])
+        self.assertEqual(len(xmlrpc.called('system.multicall')), 2)
+
+        # mutations are submitted once each
+        faults.append(xmlrpclib_Fault(101, 'session expired'))
+        c._xmlrpc_multicall(xmlrpc, [('vserver.addClientIPs', ('vs', {})), ('cluster.addClusterIPs', ({},))], idempotent=False)
+        self.assertEqual(len(xmlrpc.called('vserver.addClientIPs')), 1)
+        self.assertEqual(len(xmlrpc.called('cluster.addClusterIPs')), 1)
+        self.assertTrue(c.use_multicall)
+
+        # the xmlrpc spec method not found code turns batching off
+        faults.append(xmlrpclib_Fault(Cluster.XMLRPC_METHOD_NOT_FOUND, 'system.multicall'))
+        self.assertEqual(c._xmlrpc_multicall(xmlrpc, [('cluster.get', ())]), ['direct'])
+        self.assertFalse(c.use_multicall)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -548,7 +548,7 @@ class Service(ServiceBase):
             log.error("Failed API test: {}".format(e))
 
         log.info("Performing IAM create/delete policy test")
-        role_name = 'avere_iam_check_{}'.format(str(uuid.uuid4()).lower().replace('-', '')[0:63])
+        role_name = 'avere_iam_check_{}'.format(uuid.uuid4().hex[0:63])
         role = None
         try:
             role = self._create_iamrole(role_name)
@@ -561,7 +561,7 @@ class Service(ServiceBase):
                 log.error("Failed to delete IAM role {}: {}".format(role_name, e))
 
         log.info("Performing S3 create/delete bucket test")
-        bucket_name = str(uuid.uuid4()).lower().replace('-', '')[0:63]
+        bucket_name = uuid.uuid4().hex[0:63]
         bucket = None
         try:
             bucket = self.create_bucket(bucket_name)
@@ -25,9 +25,10 @@ class RequestsTransport(xmlrpc.client.SafeTransport):
             ]
             super(RequestsTransport.CustomAdapter, self).init_poolmanager(*args, **kwargs)
 
-    def __init__(self, use_datetime=0, do_cert_checks=True):
+    def __init__(self, use_datetime=0, do_cert_checks=True, timeout=None):
         xmlrpc.client.SafeTransport.__init__(self, use_datetime=use_datetime)
         self._do_cert_checks = do_cert_checks
+        self.timeout = timeout # seconds to wait to connect and for each response, None waits forever
         socket_opts_adapter = self.CustomAdapter()
         self._requests_session = requests.session()
         self._requests_session.mount('http://', socket_opts_adapter)
@@ -39,22 +40,22 @@ class RequestsTransport(xmlrpc.client.SafeTransport):
         headers = {}
         url = 'https://{}/{}'.format(host, handler)
 
-        response = self._requests_session.post(url, data=request_body, headers=headers, stream=True, cert=None, verify=self._do_cert_checks)
+        response = self._requests_session.post(url, data=request_body, headers=headers, stream=True, cert=None, verify=self._do_cert_checks, timeout=self.timeout)
         response.raise_for_status()
         if verbose:
             logging.debug(response.headers)
         return self.parse_response(response.raw)
 
     @staticmethod
-    def get_client_and_transport(server_uri, verbose=False, do_cert_checks=True):
+    def get_client_and_transport(server_uri, verbose=False, do_cert_checks=True, timeout=None):
         '''Return an xmlrpc client which supports authentication via cookies'''
-        trans = RequestsTransport(do_cert_checks=do_cert_checks)
+        trans = RequestsTransport(do_cert_checks=do_cert_checks, timeout=timeout)
         client = xmlrpc.client.ServerProxy(server_uri, transport=trans, verbose=verbose)
         return trans, client
 
     @staticmethod
-    def get_client(server_uri, verbose=False, do_cert_checks=True):
-        return RequestsTransport.get_client_and_transport(server_uri, verbose, do_cert_checks)[1]
+    def get_client(server_uri, verbose=False, do_cert_checks=True, timeout=None):
+        return RequestsTransport.get_client_and_transport(server_uri, verbose, do_cert_checks, timeout)[1]
 
 getXmlrpcClientAndTransport = RequestsTransport.get_client_and_transport
 getXmlrpcClient = RequestsTransport.get_client
@@ -136,7 +136,7 @@ def _add_nfs_corefiler(cluster, logger, args):
     return corefiler
 
 def _add_bucket_corefiler(cluster, logger, args):
-    bucketname = args.bucket or "{}-{}".format(cluster.name, str(uuid.uuid4()).lower().replace('-', ''))[0:63]
+    bucketname = args.bucket or "{}-{}".format(cluster.name, uuid.uuid4().hex)[0:63]
     corefiler = args.core_filer or cluster.service.__module__.split('.')[-1]
 
     bucket_opts = {